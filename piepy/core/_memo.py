@@ -0,0 +1,53 @@
+import os
+
+from ..utils import jsonify, save_dict_json, load_json_dict
+
+
+class SessionMemo:
+    """A small on-disk index of already analyzed sessions.
+    Maps the session directory to its summary row and the saved run data of the session,
+    an entry is only valid as long as the prot and stimlog files and the run data don't change
+    """
+
+    def __init__(self, memo_path: str) -> None:
+        self.memo_path = memo_path
+        if os.path.exists(self.memo_path):
+            self.memo = load_json_dict(self.memo_path)
+        else:
+            self.memo = {}
+
+    @staticmethod
+    def make_key(session_path: str, data_path: str) -> str:
+        """Makes a key from the modification times of the prot and stimlog files of the session
+        and of the saved run data"""
+        mtimes = []
+        for root, _, files in os.walk(session_path):
+            for f in sorted(files):
+                if f.endswith(".prot") or f.endswith(".stimlog"):
+                    mtimes.append(f"{os.path.getmtime(os.path.join(root, f))}")
+        mtimes.append(f"{os.path.getmtime(data_path)}")
+        return ":".join(mtimes)
+
+    def get(self, sessiondir: str, session_path: str) -> tuple[dict, str] | None:
+        """Returns the memoized summary and the path of the saved run data of the session,
+        None if entry is missing or stale"""
+        entry = self.memo.get(sessiondir)
+        if entry is None or not os.path.exists(entry["data_path"]):
+            return None
+        if entry["key"] != self.make_key(session_path, entry["data_path"]):
+            return None
+        return dict(entry["summary"]), entry["data_path"]
+
+    def set(
+        self, sessiondir: str, session_path: str, summary: dict, data_path: str
+    ) -> None:
+        """Adds the entry to the memo, pointing to the already saved run data at data_path"""
+        self.memo[sessiondir] = {
+            "key": self.make_key(session_path, data_path),
+            "summary": jsonify(summary),
+            "data_path": data_path,
+        }
+
+    def save(self) -> None:
+        """Saves the memo index"""
+        save_dict_json(self.memo_path, self.memo)
@@ -1,4 +1,5 @@
 import sqlite3
+import functools
 import pandas as pd
 
 
@@ -8,6 +9,15 @@ def safe_str(var_string: str) -> str:
     return var_string
 
 
+@functools.lru_cache(maxsize=64)
+def _cached_entries(db_path: str, table_name: str, entry_items: tuple) -> pd.DataFrame:
+    """Reads the entries once per (database, table, condition), cleared whenever something is written"""
+    db = DataBaseInterface(db_path)
+    entries = db.get_entries(dict(entry_items), table_name)
+    db.close()
+    return entries
+
+
 class DataBaseInterface:
     def __init__(self, db_path: str):
         self.db_path: str = db_path
@@ -66,6 +76,7 @@ class DataBaseInterface:
             vals = vals[:-2]
             command += vals + ")"
             self.cursor.execute(command, entry)
+            _cached_entries.cache_clear()
             self.commit()
             self.close()
             if verbose:
@@ -95,6 +106,7 @@ class DataBaseInterface:
             command += f"""{safe_str(str(k))}='{safe_str(str(v))}' AND """
         command = command[:-4]  # remove the last AND
         self.cursor.execute(command, update_dict)
+        _cached_entries.cache_clear()
         if verbose:
             print(f"Sent command to update the entry in {table_name} table")
         self.commit()
@@ -126,6 +138,7 @@ class DataBaseInterface:
             command = f"""DELETE FROM {safe_str(table_name)} WHERE {safe_str(str(entry_field[0]))}='{safe_str(str(entry_val[0]))}'"""
 
         self.cursor.execute(command)
+        _cached_entries.cache_clear()
         print(f"Removed {entry} in {table_name} table")
         self.commit()
         self.close()
@@ -138,6 +151,7 @@ class DataBaseInterface:
 
         command = f""" DROP TABLE {safe_str(table_name)}"""
         self.cursor.execute(command)
+        _cached_entries.cache_clear()
         print(f"Deleted the {table_name} table!")
         self.commit()
         self.close()
@@ -172,6 +186,14 @@ class DataBaseInterface:
 
         return df
 
+    def get_entries_cached(self, entry_dict: dict, table_name: str) -> pd.DataFrame:
+        """Same as get_entries, but repeated lookups are read from memory until the database is written to"""
+        entries = _cached_entries(
+            self.db_path, table_name, tuple(sorted(entry_dict.items()))
+        )
+        # return a copy so the cached frame can't be modified
+        return entries.copy()
+
     def print_table(self, table_name: str) -> pd.DataFrame:
         """Returns the table as a dataframe"""
         if self.cursor is None:
@@ -6,15 +6,19 @@ import importlib
 import numpy as np
 import polars as pl
 import pandas as pd
+import multiprocessing
 from tqdm import tqdm
 from os.path import join as pjoin
 from collections import namedtuple
 from datetime import datetime as dt
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from os.path import dirname, abspath, normpath
 
 from ..core.config import config as cfg
 from ..utils import display, timeit
-from ..gsheet_functions import GSheet
+from ..gsheet_functions import cached_sheet
+from ._memo import SessionMemo
+from .run import PARQUET_ROW_GROUP_SIZE
 
 
 class MouseMeta:
@@ -39,50 +43,23 @@ class MouseData:
 
         tmp = pl.DataFrame(summary_data_list)
         if self.summary_data is not None:
-            if self.summary_data.dtypes != tmp.dtypes:
-                self.summary_data = self.summary_data.with_columns(
-                    [
-                        pl.col(n).cast(t, strict=False)
-                        for n, t in zip(self.summary_data.columns, tmp.dtypes)
-                        if t != pl.Null
-                    ]
-                )
-            self.summary_data = pl.concat([self.summary_data, tmp])
+            # relaxed concat casts the columns to their common supertype
+            self.summary_data = pl.concat(
+                [self.summary_data, tmp], how="diagonal_relaxed"
+            )
         else:
             self.summary_data = tmp
 
-        if self.cumul_data is None:
-            # if no cumulative data exists, make one from the first in list and iterate over the rest
-            self.cumul_data = cumul_data_list[0]
-            cumul_data_list = cumul_data_list[1:]
-
-        if "cumul_trial_no" in self.cumul_data.columns:
-            self.cumul_data = self.cumul_data.drop("cumul_trial_no")
-
-        for new_cumul in cumul_data_list:
-            # if there are columns that are not in df add them with None
-            for c in new_cumul.columns:
-                if c not in self.cumul_data.columns:
-                    self.cumul_data = self.cumul_data.with_columns(pl.lit(None).alias(c))
-
-            # sorting the columns
-            new_cumul = new_cumul.select(self.cumul_data.columns)
-            # fixing column datatypes
-            if self.cumul_data.dtypes != new_cumul.dtypes:
-                try:
-                    self.cumul_data = self.cumul_data.with_columns(
-                        [
-                            pl.col(n).cast(t)
-                            for n, t in zip(self.cumul_data.columns, new_cumul.dtypes)
-                            if t != pl.Null
-                        ]
-                    )
-                except:
-                    print("jlsdiobjsdf")
-            try:
-                self.cumul_data = pl.concat([self.cumul_data, new_cumul])
-            except pl.SchemaError:
-                raise pl.SchemaError("WEIRDNESS WITH COLUMNS")
+        frames = list(cumul_data_list)
+        if self.cumul_data is not None:
+            if "cumul_trial_no" in self.cumul_data.columns:
+                self.cumul_data = self.cumul_data.drop("cumul_trial_no")
+            frames.insert(0, self.cumul_data)
+        # a single concat over all the sessions, missing columns are filled with null
+        try:
+            self.cumul_data = pl.concat(frames, how="diagonal_relaxed")
+        except pl.SchemaError:
+            raise pl.SchemaError("WEIRDNESS WITH COLUMNS")
 
         # sort both by date
         self.cumul_data = self.cumul_data.sort(["date", "trial_no"])
@@ -112,8 +89,17 @@ class MouseData:
             )
 
             summary_save_data.write_csv(summary_save_name)
-            # cumul data is lazy df, so sink it instead of directly writing it
-            self.cumul_data.write_parquet(cumul_save_name, compression="lz4")
+            # stream the cumulative data into a temporary file and swap it in,
+            # an interrupted write never leaves a truncated history behind
+            tmp_save_name = f"{cumul_save_name}.tmp"
+            self.cumul_data.lazy().sink_parquet(
+                tmp_save_name,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=PARQUET_ROW_GROUP_SIZE,
+                maintain_order=True,
+            )
+            os.replace(tmp_save_name, cumul_save_name)
         else:
             display("No data to save...")
 
@@ -147,6 +133,43 @@ class MouseData:
         )
 
 
+def _analyze_one(session_parser, sessiondir: str, load_flag: bool, gsheet_df):
+    """Analyzes a single session and returns its summary dict, data and the path of the saved data,
+    module level so it can be pickled into the worker processes of Mouse.gather_data
+    """
+    detect_session = session_parser(sessiondir, load_flag=load_flag, gsheet_df=gsheet_df)
+    session_data = detect_session.data.data
+    # the run data the session parser saved, the memo points to it instead of another copy
+    data_path = next(
+        (p for p in detect_session.runs[0].paths.data if os.path.exists(p)), None
+    )
+    summary_temp = {}
+    if len(session_data):
+        # add behavior related fields as a dictiionary
+        meta = detect_session.get_meta()
+        summary_temp["date"] = meta.baredate
+        summary_temp["blank_time"] = meta.openStimDuration
+        summary_temp["response_window"] = meta.closedStimDuration
+        try:
+            summary_temp["level"] = int(meta.level)
+        except:
+            summary_temp["level"] = -1
+        # placeholder to keep the column order, set when the sessions are collected
+        summary_temp["session_no"] = None
+
+        # put data from session stats
+        for k in detect_session.stats.__slots__:
+            summary_temp[k] = getattr(detect_session.stats, k, None)
+
+        # put values from session meta data
+        summary_temp["weight"] = meta.weight
+        summary_temp["task"] = meta.controller
+        summary_temp["sf"] = meta.sf_values
+        summary_temp["tf"] = meta.tf_values
+        summary_temp["rig"] = meta.rig
+    return summary_temp, session_data, data_path
+
+
 class Mouse:
     """Analyzes the training progression of animals through multiple sessions
     animalid:  id of the animal to be analyzed(e.g. KC033)
@@ -300,60 +323,79 @@ class Mouse:
             # load_and_add and last_saved will enter here
             self.load()
             session_counter = self.data.summary_data[-1, "session_no"]
-        summary_to_append = []
+        summary_to_append = {}
         cumul_to_append = []
 
-        # we're analyzing the individual sessions here in this below loop
+        # sessions that didn't change since they were last added are read from the memo
+        memo = SessionMemo(
+            pjoin(self.paths.analysis, f".{self.animalid}_session_memo.json")
+        )
+
+        # sessions that are not memoized are analyzed in parallel, each in its own process
+        memoized = {}
+        to_analyze = []
+        for row in missing_sessions.iter_rows():
+            if load_type not in ["no_load", "reanalyze"]:
+                # no_load and reanalyze always run the session analysis so they never use the memo
+                memo_entry = memo.get(row[1], row[4])
+                if memo_entry is not None:
+                    memoized[row[1]] = memo_entry
+                    continue
+            to_analyze.append(row[1])
+
+        # no_load doesn't load the saved session data, reanalyze does
+        load_flag = load_type != "no_load"
+        analyzed = {}
+        if len(to_analyze) > 1:
+            # spawn instead of fork, forking a process that runs polars threads can deadlock
+            with ProcessPoolExecutor(
+                max_workers=min(8, len(to_analyze), os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as ex:
+                futs = {
+                    ex.submit(
+                        _analyze_one, self.session_parser, s, load_flag, self.gsheet_df
+                    ): s
+                    for s in to_analyze
+                }
+                # progress follows the sessions as they finish, in whatever order that is
+                for f in tqdm(
+                    as_completed(futs), total=len(futs), desc="Analyzing sessions"
+                ):
+                    analyzed[futs[f]] = f.result()
+        elif len(to_analyze):
+            analyzed[to_analyze[0]] = _analyze_one(
+                self.session_parser, to_analyze[0], load_flag, self.gsheet_df
+            )
+
+        # results are collected in session order so session numbers stay consecutive
         pbar = tqdm(missing_sessions)
         for i, row in enumerate(missing_sessions.iter_rows()):
             # last_saved will not enter here as missing sessions will be []
-            pbar.set_description(f"Analyzing {row[1]} [{i+1}/{len(missing_sessions)}]")
+            pbar.set_description(f"Collecting {row[1]} [{i+1}/{len(missing_sessions)}]")
 
-            if load_type == "no_load":
-                detect_session = self.session_parser(
-                    row[1], load_flag=False, skip_google=True
-                )
+            is_memoized = row[1] in memoized
+            if is_memoized:
+                # the run data goes through the session's own loading to get the added columns
+                summary_temp, data_path = memoized[row[1]]
+                session_data = self.session_parser.load_run_data(data_path)
             else:
-                # reanalyze load type should enter here
-                detect_session = self.session_parser(
-                    row[1], load_flag=True, skip_google=True
-                )
-
-            session_data = detect_session.data.data
-            gsheet_dict = self.get_gsheet_row(
-                detect_session.meta.baredate,
-                cols=[
-                    "paradigm",
-                    "supp water [µl]",
-                    "user",
-                    "time [hh:mm]",
-                    "rig water [µl]",
-                ],
-            )
+                summary_temp, session_data, data_path = analyzed[row[1]]
 
             if len(session_data):
-                # add behavior related fields as a dictiionary
-                meta = detect_session.get_meta()
-                summary_temp = {}
-                summary_temp["date"] = meta.baredate
-                summary_temp["blank_time"] = meta.openStimDuration
-                summary_temp["response_window"] = meta.closedStimDuration
-                try:
-                    summary_temp["level"] = int(meta.level)
-                except:
-                    summary_temp["level"] = -1
+                # session numbers and the sheet entries can change between runs, always reset them
                 summary_temp["session_no"] = session_counter + 1
-
-                # put data from session stats
-                for k in detect_session.stats.__slots__:
-                    summary_temp[k] = getattr(detect_session.stats, k, None)
-
-                # put values from session meta data
-                summary_temp["weight"] = meta.weight
-                summary_temp["task"] = meta.controller
-                summary_temp["sf"] = meta.sf_values
-                summary_temp["tf"] = meta.tf_values
-                summary_temp["rig"] = meta.rig
+                gsheet_dict = self.get_gsheet_row(
+                    summary_temp["date"],
+                    cols=[
+                        "weight [g]",
+                        "paradigm",
+                        "supp water [µl]",
+                        "user",
+                        "time [hh:mm]",
+                        "rig water [µl]",
+                    ],
+                )
                 summary_temp = {**summary_temp, **gsheet_dict}
 
                 session_data = session_data.with_columns(
@@ -363,19 +405,23 @@ class Mouse:
                     ]
                 )
 
+                if not is_memoized and data_path is not None:
+                    memo.set(row[1], row[4], summary_temp, data_path)
+
                 cumul_to_append.append(session_data)
-                if i == 0:
-                    summary_to_append = {k: [v] for k, v in summary_temp.items()}
-                else:
-                    for k, v in summary_temp.items():
-                        summary_to_append[k].append(v)
+                # summary is collected column-wise and built into a frame once in append
+                for k, v in summary_temp.items():
+                    summary_to_append.setdefault(k, []).append(v)
 
                 session_counter += 1
             else:
-                display(f" >>> WARNING << NO DATA FOR SESSION {row[1]}", color="yellow")
+                # tqdm.write keeps the progress bar intact instead of redrawing it
+                tqdm.write(f" >>> WARNING << NO DATA FOR SESSION {row[1]}")
                 continue
             pbar.update()
 
+        memo.save()
+
         if len(summary_to_append):
             self.data.append(cumul_to_append, summary_to_append)
             display("Appended new data!", color="cyan")
@@ -386,11 +432,11 @@ class Mouse:
         if cols is None:
             cols = ["weight [g]", "supp water [µl]", "user", "time [hh:mm]"]
         # current date data
-        row = self.gsheet_df[self.gsheet_df["Date [YYMMDD]"] == date]
+        row = self._gsheet_lookup.get(date)
         for c in cols:
             key = c.split("[")[0].strip(" ")  # get rid of units in column names
-            if len(row):
-                sheet_stats[key] = row[c].values[0]
+            if row is not None:
+                sheet_stats[key] = row[c]
             else:
                 sheet_stats[key] = None
         return sheet_stats
@@ -398,9 +444,11 @@ class Mouse:
     # TODO:
     def read_googlesheet(self) -> None:
         """Reads all the entries from the googlesheet with the current animal id"""
-        logsheet = GSheet("Mouse Database_new")
+        # read the sheet fresh, entries could have been added since it was last cached
+        # the sessions reading the sheet later on reuse this read
+        cached_sheet.cache_clear()
         # below, 2 is the log2021 sheet ID
-        temp_df = logsheet.read_sheet(2)
+        temp_df = cached_sheet("Mouse Database_new", 2)
 
         temp_df = temp_df[temp_df["Mouse ID"] == self.animalid]
 
@@ -413,10 +461,14 @@ class Mouse:
             temp_df["supp water [µl]"], errors="coerce"
         ).fillna(0)
 
-        temp_df["Date [YYMMDD]"] = temp_df["Date [YYMMDD]"].apply(lambda x: str(x))
+        temp_df["Date [YYMMDD]"] = temp_df["Date [YYMMDD]"].astype(str)
         temp_df["Date_dt"] = pd.to_datetime(temp_df["Date [YYMMDD]"], format="%y%m%d")
 
         self.gsheet_df = temp_df
+        # date -> row lookup so sessions don't filter the whole sheet, first entry of a date wins
+        self._gsheet_lookup = {}
+        for rec in temp_df.to_dict("records"):
+            self._gsheet_lookup.setdefault(rec["Date [YYMMDD]"], rec)
         # self.gsheet_df = pl.from_pandas(data=temp_df)
 
     def save(self) -> None:
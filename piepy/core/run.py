@@ -1,3 +1,7 @@
+import re
+import pyarrow as pa
+import pyarrow.compute as pc
+from concurrent.futures import ThreadPoolExecutor
 import scipy.io as sio
 from os.path import join as pjoin
 from os.path import exists as exists
@@ -7,6 +11,34 @@ from .exceptions import *
 from .logger import Logger
 from .pathfinder import *
 
+# parquet writing options, bounded row groups keep the peak memory of the writer low
+PARQUET_ROW_GROUP_SIZE = 128 * 1024
+# runs larger than this (in bytes) are streamed to disk instead of written at once
+STREAM_PARQUET_SIZE = 512 * 1024**2
+# training level from the prot file name, e.g. ..._level2.prot -> "2"
+_LEVEL_RE = re.compile(r"level([^._]+)")
+
+
+def _column_to_mat(arr: pa.ChunkedArray) -> np.ndarray:
+    """Converts an arrow column into an array savemat can write"""
+    if pa.types.is_list(arr.type) or pa.types.is_large_list(arr.type):
+        # nested columns(wheel, lick, reward, etc.) are saved as cell arrays
+        cells = np.empty(len(arr), dtype=object)
+        for i, v in enumerate(arr.to_pylist()):
+            cells[i] = np.asarray(v if v is not None else [])
+        return cells
+    if arr.null_count:
+        # savemat can't write None, fill the nulls with the matlab friendly empty values
+        if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type):
+            arr = pc.fill_null(arr, "")
+        elif (
+            pa.types.is_integer(arr.type)
+            or pa.types.is_floating(arr.type)
+            or pa.types.is_boolean(arr.type)
+        ):
+            arr = pc.fill_null(arr.cast(pa.float64()), np.nan)
+    return arr.to_numpy(zero_copy_only=False)
+
 
 class RunMeta:
     def __init__(self, prot_file: str) -> None:
@@ -43,17 +75,8 @@ class RunMeta:
         if self.opto:
             self.opto_mode = int(self.opts.get("optoMode", 0))  # 0 continuous, 1 pulsed
 
-        lvl = ""
-        if self.prot_file.find("level") != -1:
-            tmp = self.prot_file[self.prot_file.find("level") + len("level") :]
-            for char in tmp:
-                if char not in [".", "_"]:
-                    lvl += char
-                else:
-                    break
-        else:
-            lvl = "exp"
-        self.level = lvl
+        m = _LEVEL_RE.search(self.prot_file)
+        self.level = m.group(1) if m else "exp"
 
         os_stat = os.stat(self.prot_file)
         if sys.platform == "darwin":
@@ -73,7 +96,27 @@ class RunData:
     def save_data(self, save_path: str, save_mat: bool = False) -> None:
         """Saves the run data as .parquet (and .mat file if desired)"""
         data_save_path = pjoin(save_path, "runData.parquet")
-        self.data.write_parquet(data_save_path)
+        if (
+            os.environ.get("STREAM_PARQUET")
+            or self.data.estimated_size() > STREAM_PARQUET_SIZE
+        ):
+            # nested columns(wheel, lick, reward, etc.) can get very large, stream them
+            self.data.lazy().sink_parquet(
+                data_save_path,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=PARQUET_ROW_GROUP_SIZE,
+                statistics=True,
+                maintain_order=True,
+            )
+        else:
+            self.data.write_parquet(
+                data_save_path,
+                compression="zstd",
+                compression_level=3,
+                row_group_size=PARQUET_ROW_GROUP_SIZE,
+                statistics=True,
+            )
         if save_mat:
             self.save_as_mat(save_path)
             display(f"Saved .mat file at {save_path}", color="green")
@@ -88,8 +131,17 @@ class RunData:
         """Helper method to convert the data into a .mat file"""
         datafile = pjoin(save_path, "sessionData.mat")
 
-        save_dict = {name: col.values for name, col in self.data.stim_data.items()}
-        sio.savemat(datafile, save_dict)
+        # single chunk columns so each conversion is one contiguous buffer
+        tbl = self.data.to_arrow().combine_chunks()
+        # arrow releases the GIL while converting, so columns can be converted in parallel
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as ex:
+            futs = {
+                name: ex.submit(_column_to_mat, arr)
+                for name, arr in zip(tbl.column_names, tbl.columns)
+                if not pa.types.is_null(arr.type)  # all null columns(e.g. opto_region)
+            }
+            save_dict = {name: f.result() for name, f in futs.items()}
+        sio.savemat(datafile, save_dict, do_compression=True)
         display(f"Saved .mat file at {datafile}")
 
 
@@ -3,17 +3,19 @@ from os.path import exists as exists
 from .run import *
 from ..utils import *
 from .pathfinder import PathFinder
-from ..gsheet_functions import GSheet
+from ..gsheet_functions import cached_sheet
 from .dbinterface import DataBaseInterface
 
 
 class SessionMeta:
     """An object to hold Session meta data"""
 
-    def __init__(self, sessiondir: str, skip_google: bool = False) -> None:
+    def __init__(
+        self, sessiondir: str, skip_google: bool = False, gsheet_df: pd.DataFrame = None
+    ) -> None:
         """Initializes the meta either from a prot file"""
         self.set_attrs_from_sessiondir(sessiondir)
-        self.set_session_weight_and_water(skip_google=skip_google)
+        self.set_session_weight_and_water(skip_google=skip_google, gsheet_df=gsheet_df)
 
     def __repr__(self):
         kws = [
@@ -59,19 +61,25 @@ class SessionMeta:
         self.date = dt.strptime(self.baredate, "%y%m%d").date()
         self.nicedate = dt.strftime(self.date, "%d %b %y")
 
-    def set_session_weight_and_water(self, skip_google: bool = False) -> None:
-        """Gets the session weight from google sheet"""
+    def set_session_weight_and_water(
+        self, skip_google: bool = False, gsheet_df: pd.DataFrame = None
+    ) -> None:
+        """Gets the session weight from google sheet,
+        gsheet_df is an already read (e.g. by Mouse) sheet of the animal to avoid reading it again
+        """
         self.weight = None
         self.water_consumed = None
-        if not skip_google:
-            logsheet = GSheet("Mouse Database_new")
-            gsheet_df = logsheet.read_sheet(2)
+        if gsheet_df is None and not skip_google:
+            # below, 2 is the log2021 sheet ID
+            gsheet_df = cached_sheet("Mouse Database_new", 2)
+            gsheet_df = gsheet_df[gsheet_df["Mouse ID"] == self.animalid]
+
+        if gsheet_df is not None:
+            # dates can be read as int or str depending on who read the sheet
             gsheet_df = gsheet_df[
-                (gsheet_df["Mouse ID"] == self.animalid)
-                & (gsheet_df["Date [YYMMDD]"] == int(self.baredate))
-            ]
+                gsheet_df["Date [YYMMDD]"].astype(str) == self.baredate
+            ].reset_index()
             if not gsheet_df.empty:
-                gsheet_df.reset_index(inplace=True)
                 self.weight = gsheet_df["weight [g]"].iloc[0]
                 try:
                     self.water_consumed = int(gsheet_df["rig water [µl]"].iloc[0])
@@ -110,10 +118,10 @@ class Session:
         # find relevant data paths
         self.paths = PathFinder(self.sessiondir)
 
-    def set_session_meta(self, skip_google: bool = False):
+    def set_session_meta(self, skip_google: bool = False, gsheet_df: pd.DataFrame = None):
         """Sets the metadata from session name, pref and prot files,
         to be overwritten by other Session types(e.g. WheelDetectionSession)"""
-        self.meta = SessionMeta(self.sessiondir, skip_google)
+        self.meta = SessionMeta(self.sessiondir, skip_google, gsheet_df)
         self.meta.set_session_rig(self.paths.all_paths["prefs"][0])
 
     def init_session_runs(self) -> None:
@@ -123,6 +131,14 @@ class Session:
         for r in range(self.run_count):
             self.runs.append(Run(r, self.paths))
 
+    @staticmethod
+    def load_run_data(data_path: str) -> pl.DataFrame:
+        """Loads the saved data of a run the same way init_session_runs does,
+        to be overwritten by other Session types(e.g. WheelDetectionSession)"""
+        run_data = RunData()
+        run_data.load_data(data_path)
+        return run_data.data
+
     @timeit("Saving...")
     def save_session(self) -> None:
         """Saves the session data, meta and stats"""
@@ -185,7 +201,9 @@ class Session:
 
     def get_latest_trial_count(self):
         """Gets the last trial count from"""
-        prev_trials = self.db_interface.get_entries({"id": self.meta.animalid}, "trials")
+        prev_trials = self.db_interface.get_entries_cached(
+            {"id": self.meta.animalid}, "trials"
+        )
         try:
             return int(prev_trials["total_trial_no"].iloc[-1])
         except:
@@ -193,7 +211,7 @@ class Session:
 
     def overall_session_no(self) -> int:
         """Gets the session number of the session"""
-        mouse_entry = self.db_interface.get_entries(
+        mouse_entry = self.db_interface.get_entries_cached(
             {"id": self.meta.animalid}, table_name="animals"
         )
         if len(mouse_entry):
@@ -1,3 +1,4 @@
+import functools
 import pandas as pd
 import gspread
 from googleapiclient import discovery
@@ -76,3 +77,13 @@ class GSheet:
         si = self.sheet.get_worksheet(sheet_num)
         df = pd.DataFrame.from_dict(si.get_all_records())
         return df
+
+
+@functools.lru_cache(maxsize=4)
+def cached_sheet(spreadsheet_name: str, sheet_num: int) -> pd.DataFrame:
+    """Reads the whole worksheet once, later calls with the same arguments reuse it.
+    The returned DataFrame is shared, filter it into a new frame instead of modifying it.
+    Use cached_sheet.cache_clear() to read the sheet again, e.g. after new entries are added
+    """
+    logsheet = GSheet(spreadsheet_name)
+    return logsheet.read_sheet(sheet_num)
@@ -14,11 +14,12 @@ from ..core.exceptions import *
 class BasePlotter:
     """Base plotter class that has some utility methods"""
 
-    __slots__ = ["plot_data", "fig", "color"]
+    __slots__ = ["plot_data", "fig", "color", "_prepped"]
 
     def __init__(self, data: pl.DataFrame, **kwargs):
         self.plot_data = data
         self.fig = None
+        self._prepped = None
         set_style(kwargs.pop("style", "presentation"))
         self.color = Color()
 
@@ -56,8 +57,16 @@ class BasePlotter:
 
             temp.append(uniq_col.to_list())
 
-        for u in list(itertools.product(*temp)):
-            yield (*u, data.filter([pl.col(col_name[i]) == j for i, j in enumerate(u)]))
+        # split the data once instead of filtering the whole frame for every combination
+        parts = data.partition_by(col_name, as_dict=True, maintain_order=True)
+        for u in itertools.product(*temp):
+            key = u if len(u) > 1 else u[0]
+            yield (*u, parts.get(key, data.clear()))
+
+    def prepare(self) -> None:
+        """Computes the data needed for the plot ahead of drawing it and keeps it in _prepped,
+        plotters with an expensive data preparation override this"""
+        pass
 
     @staticmethod
     def make_linear_contrast_axis(data) -> dict:
@@ -117,7 +126,7 @@ class BasePlotter:
 class PerformancePlotter(BasePlotter):
     """Plots the performance progression through the session"""
 
-    __slots__ = ["stimkey", "plot_data", "uniq_keys"]
+    __slots__ = ["stimkey", "uniq_keys"]
 
     def __init__(self, data, **kwargs):
         super().__init__(data, **kwargs)
@@ -192,7 +201,7 @@ class PerformancePlotter(BasePlotter):
 
 
 class ResponseTimePlotter(BasePlotter):
-    __slots__ = ["stimkey", "plot_data", "uniq_keys"]
+    __slots__ = ["stimkey", "uniq_keys"]
 
     def __init__(self, data, **kwargs):
         super().__init__(data, **kwargs)
@@ -278,6 +287,8 @@ class ResponseTimePlotter(BasePlotter):
 
 
 class CumulativeReactionTimePlotter(BasePlotter):
+    __slots__ = []
+
     def __init__(self, data: pl.DataFrame, **kwargs) -> None:
         super().__init__(data, **kwargs)
 
@@ -336,6 +347,8 @@ class CumulativeReactionTimePlotter(BasePlotter):
 
 
 class ReactionCumulativePlotter(BasePlotter):
+    __slots__ = ["stat_analysis"]
+
     def __init__(self, data: pl.DataFrame, **kwargs):
         super().__init__(data, **kwargs)
         self.stat_analysis = DetectionAnalysis(data=self.plot_data)
@@ -517,6 +530,8 @@ class ReactionCumulativePlotter(BasePlotter):
 class ResponseTimeDistributionPlotter(BasePlotter):
     """Plots the response times as a distribution"""
 
+    __slots__ = ["stat_analysis"]
+
     def __init__(self, data, stimkey: str = None, **kwargs) -> None:
         super().__init__(data, **kwargs)
         self.stat_analysis = DetectionAnalysis(data=self.plot_data)
@@ -671,7 +686,7 @@ class ResponseTimeDistributionPlotter(BasePlotter):
         # do cutoff
         data = data.with_columns(
             pl.col(reaction_of)
-            .apply(lambda x: [i for i in x if i is not None and i < t_cutoff])
+            .list.eval(pl.element().filter(pl.element() < t_cutoff))
             .alias("cutoff_response_times")
         )
         # make a key,value pair from signed_contrast and linear_contrast_idx
@@ -803,7 +818,7 @@ class ResponseTimeDistributionPlotter(BasePlotter):
         # do cutoff
         data = data.with_columns(
             pl.col("response_times")
-            .apply(lambda x: [i for i in x if i < t_cutoff])
+            .list.eval(pl.element().filter(pl.element() < t_cutoff))
             .alias("cutoff_response_times")
         )
 
@@ -890,7 +905,7 @@ class ResponseTimeDistributionPlotter(BasePlotter):
 
 
 class ResponseTimeHistogramPlotter(BasePlotter):
-    __slots__ = ["plot_data", "uniq_keys"]
+    __slots__ = ["uniq_keys"]
 
     def __init__(self, data, **kwargs):
         super().__init__(data=data, **kwargs)
@@ -927,7 +942,7 @@ class ResponseTimeHistogramPlotter(BasePlotter):
 
 
 class ResponseTypeBarPlotter(BasePlotter):
-    __slots__ = ["stimkey", "plot_data", "uniq_keys"]
+    __slots__ = ["stimkey", "uniq_keys"]
 
     def __init__(self, data, stimkey: str = None, **kwargs):
         super().__init__(data=data, **kwargs)
@@ -939,7 +954,7 @@ class ResponseTypeBarPlotter(BasePlotter):
 
 
 class LickPlotter(BasePlotter):
-    __slots__ = ["stimkey", "plot_data"]
+    __slots__ = ["stimkey"]
 
     def __init__(self, data: dict, stimkey: str = None, **kwargs):
         super().__init__(data, **kwargs)
@@ -1011,13 +1026,15 @@ class LickPlotter(BasePlotter):
 class LickScatterPlotter(BasePlotter):
     """Lick scatters for each trial, wrt reward or response time"""
 
+    __slots__ = []
+
     def __init__(self, data: dict, **kwargs):
         super().__init__(data, **kwargs)
 
     @staticmethod
     def __plot_scatter__(ax, t, lick_arr, **kwargs):
-
-        t_arr = [t] * len(lick_arr)
+        # t can be a single trial no or one trial no per lick
+        t_arr = np.broadcast_to(t, np.shape(lick_arr))
 
         ax.scatter(
             lick_arr, t_arr, marker="|", c="deepskyblue", s=kwargs.get("s", 20), **kwargs
@@ -1026,26 +1043,33 @@ class LickScatterPlotter(BasePlotter):
         return ax
 
     @staticmethod
-    def pool_licks(data, wrt: str = "reward"):
-        pooled_lick = np.array([])
-        error_ctr = []
-
-        for row in data.iter_rows(named=True):
-            if len(row["lick"]):
-                if wrt == "reward":
-                    try:
-                        wrt_time = row["reward"][0]
-                    except:
-                        error_ctr.append(row.trial_no)
-                        display(
-                            f"\n!!!!!! NO REWARD IN CORRECT TRIAL, THIS IS A VERY SERIOUS ERROR! SOLVE THIS ASAP !!!!!!\n"
-                        )
-                elif wrt == "response":
-                    wrt_time = row["response_latency_absolute"]
+    def flatten_licks(
+        data: pl.DataFrame, wrt: str = "reward"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Flattens the lick column into a single array of lick times relative to the wrt time of their trial,
+        returns the lick times and the trial no of each lick"""
+        data = data.drop_nulls(subset=["lick"]).filter(pl.col("lick").list.len() > 0)
+        if wrt == "reward":
+            # trials without a reward get nan lick times
+            wrt_times = data["reward"].list.first().cast(pl.Float64).to_numpy()
+        elif wrt == "response":
+            wrt_times = data["response_latency_absolute"].cast(pl.Float64).to_numpy()
+        lick_counts = data["lick"].list.len().to_numpy()
+        licks = data["lick"].explode().cast(pl.Float64).to_numpy()
+        licks = licks - np.repeat(wrt_times, lick_counts)
+        return licks, np.repeat(data["trial_no"].to_numpy(), lick_counts)
 
-                pooled_lick = np.append(pooled_lick, np.array(row["lick"]) - wrt_time)
+    @staticmethod
+    def pool_licks(data, wrt: str = "reward"):
+        pooled_lick, trial_nos = LickScatterPlotter.flatten_licks(data, wrt)
+        no_wrt = np.isnan(pooled_lick)
+        error_ctr = np.unique(trial_nos[no_wrt]).tolist()
+        if len(error_ctr):
+            display(
+                f"\n!!!!!! NO REWARD IN CORRECT TRIAL, THIS IS A VERY SERIOUS ERROR! SOLVE THIS ASAP !!!!!!\n"
+            )
         print(f"Trials with reward issue: {error_ctr}")
-        return pooled_lick
+        return pooled_lick[~no_wrt]
 
     @staticmethod
     def __plot_density__(ax, x_bins, y_dens, **kwargs):
@@ -1056,6 +1080,8 @@ class LickScatterPlotter(BasePlotter):
 
 
 class WheelTrajectoryPlotter(BasePlotter):
+    __slots__ = []
+
     def __init__(self, data: pl.DataFrame, **kwargs) -> None:
         super().__init__(data, **kwargs)
 
@@ -1156,27 +1182,23 @@ class WheelTrajectoryPlotter(BasePlotter):
 
             if len(filt_df):
                 t_interp = np.linspace(-500, 2000, n_interp)
-                wheel_all_cond = np.zeros((len(filt_df), n_interp))
-                wheel_all_cond[:] = np.nan
-                for i, trial in enumerate(filt_df.iter_rows(named=True)):
-                    wheel_time = trial["wheel_time"]
-                    wheel_pos = trial["wheel_pos"]
-
+                # the anchor point is interpolated together with the time axis
+                t_eval = np.append(t_interp, 0)
+                wheel_all_cond = np.full((len(filt_df), n_interp), np.nan)
+                anchors = filt_df[anchor_by].to_numpy()
+                for i, (wheel_time, wheel_pos) in enumerate(
+                    zip(filt_df["wheel_time"].to_list(), filt_df["wheel_pos"].to_list())
+                ):
                     if len(wheel_time) > 2:
                         # relative time
-                        wheel_time = np.array(wheel_time) - trial[anchor_by]
+                        wheel_time = np.asarray(wheel_time) - anchors[i]
 
                         pos_interp = interp1d(
                             wheel_time, wheel_pos, fill_value="extrapolate"
-                        )(t_interp)
+                        )(t_eval)
 
                         # relative position
-                        pos_at0 = interp1d(
-                            wheel_time, wheel_pos, fill_value="extrapolate"
-                        )(0)
-                        pos_interp = pos_interp - pos_at0
-
-                        wheel_all_cond[i, :] = pos_interp
+                        wheel_all_cond[i, :] = pos_interp[:-1] - pos_interp[-1]
 
                 avg = np.nanmean(wheel_all_cond, axis=0)
                 sem = stats.sem(wheel_all_cond, axis=0)
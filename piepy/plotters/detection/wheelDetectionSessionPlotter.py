@@ -1,9 +1,50 @@
+import inspect
+import functools
 from matplotlib.pyplot import axes
+from matplotlib.collections import PolyCollection
+from concurrent.futures import ThreadPoolExecutor
 from ..basePlotters import *
 from scipy.stats import fisher_exact, barnard_exact
 
+# shared generator for the jitter and shuffles, one seeding instead of one per call
+_rng = np.random.default_rng()
+
+
+def _fast_hist(x: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Counts every row of x in edges like np.histogram, all of the rows with a single bincount"""
+    x = np.atleast_2d(x)
+    n_bins = len(edges) - 1
+    idx = np.searchsorted(edges, x, side="right") - 1
+    # last bin is closed on the right, values outside edges(and nans) are not counted
+    idx[x == edges[-1]] = n_bins - 1
+    valid = (idx >= 0) & (idx < n_bins)
+    # offset the bin indices of every row to their own block of bins
+    idx = idx + np.arange(x.shape[0])[:, None] * n_bins
+    counts = np.bincount(idx[valid], minlength=x.shape[0] * n_bins)
+    return counts.reshape(x.shape[0], n_bins)
+
+
+@functools.lru_cache(maxsize=32)
+def _compute_shuffle_band(
+    onset_bytes: bytes, bt_bytes: bytes, bins_bytes: bytes, n_shuffle: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the mean and std of the shuffled response time histograms,
+    arrays come in as float64 bytes to be hashable so redraws reuse the band"""
+    onset_times = np.frombuffer(onset_bytes, dtype=np.float64)
+    blank_times = np.frombuffer(bt_bytes, dtype=np.float64)
+    bins = np.frombuffer(bins_bytes, dtype=np.float64)
+    # every trial gets the blank duration of another trial in each shuffle
+    shuffled = DetectionResponseHistogramPlotter.shuffle_times(blank_times, n_shuffle)
+    # response times from the shuffled stimulus onsets, in place on the fresh shuffles
+    np.subtract(onset_times, shuffled, out=shuffled)
+    # bin all of the shuffles at once, one histogram row per shuffle
+    shuffled_hists = _fast_hist(shuffled, bins)
+    return np.mean(shuffled_hists, axis=0), np.std(shuffled_hists, axis=0)
+
 
 class DetectionPsychometricPlotter(BasePlotter):
+    __slots__ = ["stat_analysis", "p_vals"]
+
     def __init__(self, data: pl.DataFrame, **kwargs) -> None:
         super().__init__(data, **kwargs)
         self.stat_analysis = DetectionAnalysis(data=data)
@@ -12,12 +53,10 @@ class DetectionPsychometricPlotter(BasePlotter):
     def integrate_linear_contrast_axis(self) -> None:
         """Puts the inearly spaced x-axis location for the contrast as a new column to the data"""
         contrast_axis = self.make_linear_contrast_axis(self.plot_data)
-        contrast_idx = pl.Series(
-            "linear_contrast_idx",
-            [
-                float(contrast_axis[x]) if x is not None else None
-                for x in self.stat_analysis.agg_data["signed_contrast"].to_list()
-            ],
+        contrast_idx = (
+            self.stat_analysis.agg_data["signed_contrast"]
+            .replace(contrast_axis, default=None, return_dtype=pl.Float64)
+            .alias("linear_contrast_idx")
         )
         self.stat_analysis.agg_data = self.stat_analysis.agg_data.with_columns(
             contrast_idx
@@ -39,6 +78,7 @@ class DetectionPsychometricPlotter(BasePlotter):
         xaxis_type: str = "linear_spaced",
         doP: bool = True,
         color: str = None,
+        use_errorbar: bool = False,
         **kwargs,
     ) -> plt.Axes:
         """Plots the hit rates with 95% confidence intervals
@@ -49,6 +89,7 @@ class DetectionPsychometricPlotter(BasePlotter):
         xaxis_type (str): The type of xaxis, mainly adjusts spacing
         doP (bool) : Flag to do p-value analysis
         color (str) : hex color code to overwrite the stimulus type color coding
+        use_errorbar (bool) : Flag to draw the confidence intervals as errorbars instead of a shaded band
 
         Returns:
         plt.axes: Axes object
@@ -75,31 +116,48 @@ class DetectionPsychometricPlotter(BasePlotter):
                 confs = 100 * filt_df["confs"].to_numpy()
                 count = filt_df["count"].to_numpy()
                 hr = 100 * filt_df["hit_rate"].to_numpy()
-                stim_label = filt_df["stim_label"].unique().to_numpy()
+                stim_label = filt_df[0, "stim_label"]
 
                 if jitter is not None:
-                    jittered_offset = np.array(
-                        [np.random.uniform(0, jitter) * c for c in contrast]
-                    )
-                    jittered_offset[0] += np.random.uniform(0, jitter) / 100
+                    jittered_offset = _rng.uniform(0, jitter, contrast.size) * contrast
+                    jittered_offset[0] += _rng.uniform(0, jitter) / 100
                     contrast = contrast + jittered_offset
 
-                ax.errorbar(
-                    contrast,
-                    hr,
-                    confs,
-                    marker="o",
-                    label=f"{stim_label[0]}{self._makelabel(contrast_label,count)}",
-                    color=(
-                        self.color.stim_keys[filt_key]["color"]
-                        if color is None
-                        else color
-                    ),
-                    linewidth=plt.rcParams["lines.linewidth"] * 2,
-                    elinewidth=plt.rcParams["lines.linewidth"],
-                    linestyle=self.color.stim_keys[filt_key]["linestyle"],
-                    **kwargs,
-                )
+                clr = self.color.stim_keys[filt_key]["color"] if color is None else color
+                label = f"{stim_label}{self._makelabel(contrast_label,count)}"
+                if use_errorbar:
+                    ax.errorbar(
+                        contrast,
+                        hr,
+                        confs,
+                        marker="o",
+                        label=label,
+                        color=clr,
+                        linewidth=plt.rcParams["lines.linewidth"] * 2,
+                        elinewidth=plt.rcParams["lines.linewidth"],
+                        linestyle=self.color.stim_keys[filt_key]["linestyle"],
+                        **kwargs,
+                    )
+                else:
+                    # a single band instead of an errorbar per contrast, much lighter to draw and save
+                    ax.plot(
+                        contrast,
+                        hr,
+                        marker="o",
+                        label=label,
+                        color=clr,
+                        linewidth=plt.rcParams["lines.linewidth"] * 2,
+                        linestyle=self.color.stim_keys[filt_key]["linestyle"],
+                        **kwargs,
+                    )
+                    ax.fill_between(
+                        contrast,
+                        hr - confs,
+                        hr + confs,
+                        color=clr,
+                        alpha=0.2,
+                        linewidth=0,
+                    )
         # baseline
         baseline = q.filter((pl.col("stim_side") == "catch") & (pl.col("opto") == False))
         if len(baseline):
@@ -117,9 +175,11 @@ class DetectionPsychometricPlotter(BasePlotter):
             )
             ax.axhline(100 * base_hr, color="k", linestyle=":", linewidth=2, alpha=0.7)
 
+        # unique contrasts are computed once and shared by all the axis types
+        uniq_contrast = nonearly_data["signed_contrast"].unique().sort().to_numpy()
         if xaxis_type == "log":
             ax.set_xscale("symlog")
-            x_ticks = nonearly_data["signed_contrast"].unique().sort().to_numpy()
+            x_ticks = uniq_contrast
             ax.xaxis.set_major_formatter(ticker.FormatStrFormatter("%d"))
             ax.xaxis.set_minor_locator(
                 ticker.LogLocator(base=10.0, subs=np.linspace(0.1, 1, 9, endpoint=False))
@@ -127,13 +187,13 @@ class DetectionPsychometricPlotter(BasePlotter):
             x_t = {t: t for t in x_ticks}
 
         elif xaxis_type == "linear":
-            x_ticks = nonearly_data["signed_contrast"].unique().sort().to_numpy()
+            x_ticks = uniq_contrast
             ax.set_xticks(x_ticks)
             ax.set_xlim([x_ticks[0] - 10, x_ticks[-1] + 10])
             x_t = {t: t for t in x_ticks}
 
         elif xaxis_type == "linear_spaced":
-            temp = nonearly_data["signed_contrast"].unique().sort().to_numpy()
+            temp = uniq_contrast
             x_ticks = np.arange(-(len(temp) - 1) / 2, (len(temp) - 1) / 2 + 1)
             x_t = {temp[i]: t for i, t in enumerate(x_ticks)}
             ax.set_xticks(x_ticks)
@@ -215,16 +275,87 @@ class DetectionResponseHistogramPlotter(ResponseTimeHistogramPlotter):
     @staticmethod
     def shuffle_times(x_in, n_shuffle: int = 1000) -> np.ndarray:
         """Shuffles x_in n_shuffle times"""
-        gen = np.random.default_rng()
-        x_in = x_in.reshape(-1, 1)
-        x_temp = x_in.copy()
-        shuffled_matrix = np.zeros((n_shuffle, x_in.shape[0]))
+        x_in = np.asarray(x_in, dtype=float).ravel()
+        # every row is shuffled independently in a single call
+        return _rng.permuted(np.broadcast_to(x_in, (n_shuffle, x_in.size)), axis=1)
 
-        for i in range(n_shuffle):
-            gen.shuffle(x_temp)
-            shuffled_matrix[i, :] = x_temp.reshape(1, -1)
+    def shuffled_hist_band(
+        self,
+        onset_times: np.ndarray,
+        blank_times: np.ndarray,
+        bins: np.ndarray,
+        n_shuffle: int = 1000,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the mean and std of the response time histograms with shuffled blank times,
+        onset_times are the response times from the start of the blank period of each trial
+        """
+        return _compute_shuffle_band(
+            np.ascontiguousarray(onset_times, dtype=np.float64).tobytes(),
+            np.ascontiguousarray(blank_times, dtype=np.float64).tobytes(),
+            np.ascontiguousarray(bins, dtype=np.float64).tobytes(),
+            n_shuffle,
+        )
 
-        return shuffled_matrix
+    def prepare(
+        self,
+        bin_width=50,
+        seperate_stims: bool = False,
+        shuffle: bool = False,
+        n_shuffle: int = 1000,
+    ) -> None:
+        """Computes the bins and counts of the histograms and the shuffled bands for plot"""
+        data = self.plot_data.with_columns(
+            pl.when(pl.col("outcome") != -1)
+            .then(pl.col("response_latency"))
+            .otherwise(-(pl.col("t_blank_dur") - pl.col("response_latency")))
+            .alias("blanked_response_latency")
+        )
+
+        early_data = data.filter(pl.col("outcome") == -1)
+        early = self.bin_times(
+            early_data["blanked_response_latency"].to_numpy(), bin_width
+        )
+
+        if seperate_stims:
+            data = self.make_agg_data()
+
+        hits = []
+        for t in data["stim_type"].unique().to_numpy():
+            for o in data["opto"].unique().to_numpy():
+                filt_df = data.filter(
+                    (pl.col("stim_type") == t)
+                    & (pl.col("opto") == o)
+                    & (pl.col("outcome") == 1)
+                )
+                if len(filt_df):
+                    resp_times = filt_df["response_latency"].to_numpy()
+                    counts, bins = self.bin_times(resp_times, bin_width)
+                    band = None
+                    if shuffle:
+                        band = self.shuffled_hist_band(
+                            (
+                                filt_df["response_latency"] + filt_df["t_blank_dur"]
+                            ).to_numpy(),
+                            filt_df["t_blank_dur"].to_numpy(),
+                            bins,
+                            n_shuffle,
+                        )
+                    hits.append(
+                        {
+                            "stimkey": filt_df[0, "stimkey"],
+                            "label": filt_df[0, "stim_label"],
+                            "median": np.median(resp_times),
+                            "counts": counts,
+                            "bins": bins,
+                            "band": band,
+                        }
+                    )
+
+        self._prepped = {
+            "params": (bin_width, seperate_stims, shuffle, n_shuffle),
+            "early": early,
+            "hits": hits,
+        }
 
     def make_agg_data(self):
         """Aggregates the data"""
@@ -246,81 +377,68 @@ class DetectionResponseHistogramPlotter(ResponseTimeHistogramPlotter):
         return df
 
     def plot(
-        self, ax: plt.Axes = None, bin_width=50, seperate_stims: bool = False, **kwargs
-    ):
-        n_shuffle = kwargs.get("n_shuffle", 1000)
+        self,
+        ax: plt.Axes = None,
+        bin_width=50,
+        seperate_stims: bool = False,
+        shuffle: bool = False,
+        n_shuffle: int = 1000,
+        **kwargs,
+    ) -> plt.Axes:
+        """Plots the histogram of early and hit response times
+
+        Parameters:
+        ax (plt.axes) : An axes object to place to plot,default is None, which creates the axes
+        bin_width (int) : Width of the histogram bins in ms
+        seperate_stims (bool) : Flag to plot the hits of each stimulus type seperately
+        shuffle (bool) : Flag to draw the mean and std band of the hit histograms with shuffled blank times
+        n_shuffle (int) : Number of shuffles for the shuffled band
+
+        Returns:
+        plt.axes: Axes object
+        """
         if ax is None:
             self.fig = plt.figure(figsize=kwargs.get("figsize", (15, 10)))
             ax = self.fig.add_subplot(1, 1, 1)
 
-        self.plot_data = self.plot_data.with_columns(
-            pl.when(pl.col("outcome") != -1)
-            .then(pl.col("response_latency"))
-            .otherwise(-(pl.col("t_blank_dur") - pl.col("response_latency")))
-            .alias("blanked_response_latency")
-        )
+        # prepare again if the data was prepared for other histograms
+        params = (bin_width, seperate_stims, shuffle, n_shuffle)
+        if self._prepped is None or self._prepped["params"] != params:
+            self.prepare(*params)
 
         # first plot the earlies
-        early_data = self.plot_data.filter(pl.col("outcome") == -1)
-        resp_times = early_data["blanked_response_latency"].to_numpy()
-        counts, bins = self.bin_times(resp_times, bin_width)
+        counts, bins = self._prepped["early"]
         ax = self.__plot__(ax, counts, bins, color="r", label="Early")
 
-        if seperate_stims:
-            self.plot_data = self.make_agg_data()
-
-        uniq_type = self.plot_data["stim_type"].unique().to_numpy()
-        uniq_opto = self.plot_data["opto"].unique().to_numpy()
+        for hit in self._prepped["hits"]:
+            clr = self.color.stim_keys[hit["stimkey"]]["color"]
+            ax = self.__plot__(
+                ax, hit["counts"], hit["bins"], color=clr, alpha=0.7, label=hit["label"]
+            )
 
-        for i, t in enumerate(uniq_type):
-            for o in uniq_opto:
-                filt_df = self.plot_data.filter(
-                    (pl.col("stim_type") == t)
-                    & (pl.col("opto") == o)
-                    & (pl.col("outcome") == 1)
+            # plotting the median
+            ax.axvline(
+                hit["median"], color=clr, linewidth=3, label=f"{hit['label']} Median"
+            )
+            # plotting the shuffled histograms
+            if hit["band"] is not None:
+                shuf_mean, shuf_std = hit["band"]
+                ax.fill_between(
+                    hit["bins"][1:],
+                    shuf_mean - shuf_std,
+                    shuf_mean + shuf_std,
+                    color="dimgrey",
+                    alpha=0.4,
+                    zorder=2,
+                )
+                ax.plot(
+                    hit["bins"][1:],
+                    shuf_mean,
+                    color="dimgrey",
+                    alpha=0.6,
+                    linewidth=2,
+                    zorder=3,
                 )
-                if len(filt_df):
-
-                    # resp_times_blanked = filt_df['blanked_response_latency'].to_numpy()
-                    # blank_times = filt_df['blank_time'].to_numpy()
-                    resp_times = filt_df["response_latency"].to_numpy()
-
-                    counts, bins = self.bin_times(resp_times, bin_width)
-
-                    k = filt_df[0, "stimkey"]
-                    label = filt_df[0, "stim_label"]
-                    ax = self.__plot__(
-                        ax,
-                        counts,
-                        bins,
-                        color=self.color.stim_keys[k]["color"],
-                        alpha=0.7,
-                        label=label,
-                    )
-
-                    # plotting the median
-                    ax.axvline(
-                        np.median(resp_times),
-                        color=self.color.stim_keys[k]["color"],
-                        linewidth=3,
-                        label=f"{label} Median",
-                    )
-                    # plotting the shuffled histograms
-                    # shuffled = self.shuffle_times(resp_times_blanked)
-                    # shuffled_hists = np.zeros((n_shuffle,len(counts)))
-
-                    # for i,row in enumerate(shuffled):
-
-                    #     row -= blank_times
-                    #     counts,_ = self.bin_times(row,bin_width,bins=bins)
-                    #     shuffled_hists[i,:] = counts.reshape(1,-1)
-
-                    # #mean & std
-                    # shuf_mean = np.mean(shuffled_hists,axis=0)
-                    # shuf_std = np.std(shuffled_hists,axis=0)
-
-                    # ax.fill_between(bins[1:],shuf_mean-shuf_std,shuf_mean+shuf_std,color='dimgrey',alpha=0.4,zorder=2)
-                    # ax.plot(bins[1:],shuf_mean,color='dimgrey',alpha=0.6,linewidth=2,zorder=3)
 
         fontsize = kwargs.get("fontsize", 25)
         ax.legend(
@@ -340,9 +458,15 @@ class DetectionResponseHistogramPlotter(ResponseTimeHistogramPlotter):
 class DetectionResponseTypeBarPlotter(ResponseTypeBarPlotter):
     """Plots the hit and miss counts per stimulus condition and earlies as a bar plot"""
 
+    __slots__ = []
+
     def __init__(self, data, stimkey: str = None, **kwargs):
         super().__init__(data, stimkey, **kwargs)
 
+    def prepare(self) -> None:
+        """Aggregates the counts of every stimkey and outcome pair"""
+        self._prepped = self.make_agg_data()
+
     def make_agg_data(self, remove_early: bool = False) -> pl.DataFrame:
         """Aggregates the data
 
@@ -382,29 +506,36 @@ class DetectionResponseTypeBarPlotter(ResponseTypeBarPlotter):
             self.fig = plt.figure(figsize=kwargs.pop("figsize", (15, 10)))
             ax = self.fig.add_subplot(1, 1, 1)
 
+        # count every stimkey and outcome pair in a single groupby, earlies included
+        if self._prepped is None:
+            self.prepare()
+        agg_data = self._prepped
+
         # do early first
-        early_data = self.plot_data.filter(pl.col("outcome") == -1)
         ax = self.__plot__(
             ax,
             1,
-            len(early_data),
+            agg_data.filter(pl.col("outcome") == -1)["count"].sum(),
             width=bar_width,
             color=self.color.outcome_keys[str(-1)]["color"],
             linewidth=2,
             edgecolor="k",
         )
 
-        self.plot_data = self.make_agg_data(remove_early=True)
+        # keep plot_data as is, so the plotter can be prepared again
+        hit_miss_data = agg_data.filter(pl.col("outcome") != -1)
 
-        uniq_k = self.plot_data["stimkey"].unique().to_numpy()
+        uniq_k = hit_miss_data["stimkey"].unique().to_numpy()
+        stim_parts = hit_miss_data.partition_by("stimkey", as_dict=True)
 
         label_dict = {1: "Early"}
         for i, k in enumerate(uniq_k, start=2):
-            filt_df = self.plot_data.filter(pl.col("stimkey") == k)
+            filt_df = stim_parts[k]
 
             # 0.5 because only 2 (correct and miss)
             bar_locs = [i - bar_width / 2, i + bar_width / 2]
-            bars = filt_df["count"].to_list()  # ordered by miss,correct
+            outcome_counts = dict(zip(filt_df["outcome"], filt_df["count"]))
+            bars = [outcome_counts.get(0, 0), outcome_counts.get(1, 0)]  # miss,correct
 
             label = filt_df[0, "stim_label"]
             ax = self.__plot__(
@@ -431,28 +562,26 @@ class DetectionResponseTypeBarPlotter(ResponseTypeBarPlotter):
 
 
 class DetectionResponseScatterPlotter(BasePlotter):
-    __slots__ = ["stimkey", "plot_data"]
+    __slots__ = ["stimkey"]
 
     def __init__(self, data: dict, stimkey: str = None, **kwargs):
         super().__init__(data, **kwargs)
         self.plot_data, self.stimkey = self.select_stim_data(self.data, stimkey)
 
     @staticmethod
-    def __plot_scatter__(ax, t, times_arr, **kwargs):
-        """Plots the trial no and response times[blank time,answer time] by putting them on a scatter line"""
-        c = ["k"]
-        s = [10]
-        if len(times_arr) == 1:
-            c = ["gainsboro"]
-        else:
-            if times_arr[0] < times_arr[1]:
-                c.append("forestgreen")  # correct
-
-            else:
-                c.append("orangered")
-            s.append(20)
-        t_arr = [t] * len(times_arr)
-        ax.scatter(times_arr, t_arr, s=kwargs.get("s", s), c=c, alpha=0.7)
+    def __plot_scatter__(ax, t, blank_arr, resp_arr, **kwargs):
+        """Plots the trial nos and response times[blank time,answer time] of all trials in a single scatter"""
+        n = len(t)
+        correct = blank_arr < resp_arr
+        c = ["k"] * n + np.where(correct, "forestgreen", "orangered").tolist()
+        s = np.concatenate([np.full(n, 10), np.full(n, 20)])
+        ax.scatter(
+            np.concatenate([blank_arr, resp_arr]),
+            np.concatenate([t, t]),
+            s=kwargs.get("s", s),
+            c=c,
+            alpha=0.7,
+        )
         return ax
 
     @staticmethod
@@ -465,23 +594,15 @@ class DetectionResponseScatterPlotter(BasePlotter):
     def set_wrt_response_plot_data(self, wrt="sorted") -> np.ndarray:
         """sets the plot data wrt to given argument and excludes nogo trials"""
         d = self.plot_data[self.stimkey]
+        resp = d["response_latency"].to_numpy()
+        blank = d["blank_time"].to_numpy()
         if wrt == "sorted":
             # add blank_time to correct answers
-            d["wrt_response_latency"] = d[
-                ["outcome", "blank_time", "response_latency"]
-            ].apply(
-                lambda x: (
-                    x["response_latency"] + x["blank_time"]
-                    if x["outcome"] == 1
-                    else x["response_latency"]
-                ),
-                axis=1,
+            d["wrt_response_latency"] = np.where(
+                d["outcome"].to_numpy() == 1, resp + blank, resp
             )
-
         elif wrt == "onset":
-            d["wrt_response_latency"] = d[
-                ["outcome", "blank_time", "response_latency"]
-            ].apply(lambda x: x["response_latency"] - x["blank_time"], axis=1)
+            d["wrt_response_latency"] = resp - blank
         else:
             raise ValueError(f"{wrt} is not a valid wrt value for response times")
         self.plot_data[self.stimkey] = d[d["outcome"] != 0]
@@ -506,19 +627,23 @@ class DetectionResponseScatterPlotter(BasePlotter):
 
         self.set_wrt_response_plot_data(wrt=blanks)
         times = self.plot_data[self.stimkey]["wrt_response_latency"].to_numpy()
-        times_arr = []
+        trial_idx = np.arange(len(times))
         if blanks == "sorted":
             sorted_data = self.plot_data[self.stimkey].sort_values(
                 "blank_time", ascending=False
             )
-            for i, row in enumerate(sorted_data.itertuples()):
-                times_arr = [row.blank_time, row.wrt_response_latency]
-                ax = self.__plot_scatter__(ax, i, times_arr, **kwargs)
+            ax = self.__plot_scatter__(
+                ax,
+                trial_idx,
+                sorted_data["blank_time"].to_numpy(),
+                sorted_data["wrt_response_latency"].to_numpy(),
+                **kwargs,
+            )
             x_label = "Response Time (ms)"
         elif blanks == "onset":
-            for i, t in enumerate(times):
-                times_arr = [0, t]
-                ax = self.__plot_scatter__(ax, i, times_arr, **kwargs)
+            ax = self.__plot_scatter__(
+                ax, trial_idx, np.zeros(len(times)), times, **kwargs
+            )
             x_label = "Time from Stim Onset (ms)"
 
         ax_density = ax.inset_axes([0, 0, 1, 0.1], frameon=False, sharex=ax)
@@ -530,13 +655,7 @@ class DetectionResponseScatterPlotter(BasePlotter):
         fontsize = kwargs.get("fontsize", 14)
 
         ax.set_ylim([-30, None])
-        ax.set_yticks(
-            [
-                i
-                for i in range(len(self.plot_data[self.stimkey]))
-                if i >= 0 and i % 50 == 0
-            ]
-        )
+        ax.set_yticks(np.arange(0, len(self.plot_data[self.stimkey]), 50))
         ax.set_xlabel(x_label, fontsize=fontsize)
         ax.set_ylabel("Trial No.", fontsize=fontsize)
         ax.tick_params(labelsize=fontsize)
@@ -557,18 +676,9 @@ class DetectionLickScatterPlotter(LickScatterPlotter):
     def __init__(self, data, stimkey: str = None, **kwargs):
         super().__init__(data, stimkey, **kwargs)
 
-    def plot(
-        self,
-        ax: plt.Axes = None,
-        bin_width: int = 20,
-        wrt: str = "reward",
-        plt_range: list = None,
-        **kwargs,
-    ):
-        if plt_range is None:
-            plt_range = [-1000, 1000]
-        fontsize = kwargs.pop("fontsize", 25)
-
+    def prepare(self, wrt: str = "reward") -> None:
+        """Adds the blanked and absolute response latencies,
+        and flattens the licks relative to the reward or response of their trials"""
         lick_data = self.plot_data.with_columns(
             [
                 (
@@ -584,6 +694,48 @@ class DetectionLickScatterPlotter(LickScatterPlotter):
             ]
         )
 
+        if wrt == "reward":
+            lick_data = lick_data.drop_nulls(subset=["reward", "lick"])
+            wrt_times = lick_data["reward"].list.first().to_numpy()
+            marker_times = lick_data["response_latency_absolute"].to_numpy() - wrt_times
+        elif wrt == "response":
+            lick_data = lick_data.drop_nulls(subset=["lick"])
+            marker_times = np.full(len(lick_data), 100)  # potential reward time
+        else:
+            raise ValueError(
+                f"Can't plot licks with respect to {wrt}, try reward or response"
+            )
+
+        # all of the licks as flat arrays, relative to the wrt time of their trial
+        pooled_licks, lick_trial_nos = self.flatten_licks(lick_data, wrt)
+        self._prepped = {
+            "wrt": wrt,
+            "data": lick_data,
+            "marker_times": marker_times,
+            "licks": pooled_licks,
+            "lick_trial_nos": lick_trial_nos,
+        }
+
+    def plot(
+        self,
+        ax: plt.Axes = None,
+        bin_width: int = 20,
+        wrt: str = "reward",
+        plt_range: list = None,
+        **kwargs,
+    ):
+        if plt_range is None:
+            plt_range = [-1000, 1000]
+        fontsize = kwargs.pop("fontsize", 25)
+
+        # prepare again if the licks were prepared wrt something else
+        if self._prepped is None or self._prepped["wrt"] != wrt:
+            self.prepare(wrt)
+        lick_data = self._prepped["data"]
+        marker_times = self._prepped["marker_times"]
+        pooled_licks = self._prepped["licks"]
+        lick_trial_nos = self._prepped["lick_trial_nos"]
+
         bins = int((plt_range[1] - plt_range[0]) / bin_width)
 
         if ax is None:
@@ -591,70 +743,47 @@ class DetectionLickScatterPlotter(LickScatterPlotter):
             ax = self.fig.add_subplot(1, 1, 1)
 
         if wrt == "reward":
-            lick_data = lick_data.drop_nulls(subset=["reward", "lick"])
             x_label = "Time from Reward (ms)"
             wrt_color = "r"
-            for i, row in enumerate(lick_data.iter_rows(named=True)):
-
-                wrt_time = row["reward"][0]
-                response_time = row["response_latency_absolute"] - wrt_time
-
-                ax.scatter(
-                    response_time,
-                    row["trial_no"],
-                    c="k",
-                    marker="|",
-                    s=20,
-                    zorder=2,
-                    label="Reward*" if i == 0 else "_",
-                )
-                ax.axhspan(
-                    row["trial_no"] - 0.5,
-                    row["trial_no"] + 0.5,
-                    color=self.color.stim_keys[row["stimkey"]]["color"],
-                    alpha=0.3,
-                )
-
-                licks = np.array(row["lick"]) - wrt_time
-                ax = self.__plot_scatter__(ax, row["trial_no"], licks, **kwargs)
-
+            marker_color = "k"
         elif wrt == "response":
-            lick_data = lick_data.drop_nulls(subset=["lick"])
             x_label = "Time from Response (ms)"
             wrt_color = "k"
-            for i, row in enumerate(lick_data.iter_rows(named=True)):
-
-                wrt_time = row["response_latency_absolute"]
-
-                if row["reward"] is not None:
-                    reward = row["reward"][0] - wrt_time
-                else:
-                    reward = 100  # potential reward time
-                ax.scatter(
-                    100,
-                    row["trial_no"],
-                    c="r",
-                    marker="|",
-                    s=20,
-                    zorder=2,
-                    label="Reward*" if i == 0 else "_",
-                )
-                ax.axhspan(
-                    row["trial_no"] - 0.5,
-                    row["trial_no"] + 0.5,
-                    color=self.color.stim_keys[row["stimkey"]]["color"],
-                    alpha=0.3,
-                )
+            marker_color = "r"
+
+        trial_nos = lick_data["trial_no"].to_numpy()
+        ax.scatter(
+            marker_times,
+            trial_nos,
+            c=marker_color,
+            marker="|",
+            s=20,
+            zorder=2,
+            label="Reward*",
+        )
+        # one collection of full width trial bands, same as an axhspan per trial
+        spans = [
+            [(0, t - 0.5), (1, t - 0.5), (1, t + 0.5), (0, t + 0.5)] for t in trial_nos
+        ]
+        span_colors = [
+            self.color.stim_keys[k]["color"] for k in lick_data["stimkey"].to_list()
+        ]
+        ax.add_collection(
+            PolyCollection(
+                spans,
+                color=span_colors,
+                alpha=0.3,
+                transform=ax.get_yaxis_transform(),
+            ),
+            autolim=False,
+        )
 
-                licks = np.array(row["lick"]) - wrt_time
-                ax = self.__plot_scatter__(ax, row["trial_no"], licks, **kwargs)
+        ax = self.__plot_scatter__(ax, lick_trial_nos, pooled_licks, **kwargs)
 
         ax.axvline(0, c=wrt_color, linewidth=2, zorder=1)
 
         ax_density = ax.inset_axes([0, 1, 1, 0.1], frameon=False, sharex=ax)
 
-        pooled_licks = self.pool_licks(lick_data, wrt)
-
         hist, bins = np.histogram(pooled_licks, bins=bins, range=plt_range)
         density = (hist / len(pooled_licks)) / bin_width
         ax_density = self.__plot_density__(ax_density, bins, density, zorder=2, **kwargs)
@@ -714,6 +843,9 @@ class DetectionWheelTrajectoryPlotter(WheelTrajectoryPlotter):
 
 
 class DetectionSummaryPlotter:
+    """Plots the session summary figure, save() or plot(out_path=...) closes the figure
+    so batches can create one plotter per session without holding on to old figures"""
+
     __slots__ = ["data", "fig", "plotters", "stimkey"]
 
     def __init__(self, data, stimkey: str = None, **kwargs):
@@ -736,7 +868,35 @@ class DetectionSummaryPlotter:
             "lickdist": DetectionLickScatterPlotter(self.data, self.stimkey),
         }
 
-    def plot(self, **kwargs):
+    @staticmethod
+    def _prepare_args(plotter, plot_kwargs: dict) -> dict:
+        """Picks the arguments of a panel's plot call that its prepare also takes"""
+        params = inspect.signature(plotter.prepare).parameters
+        return {k: v for k, v in plot_kwargs.items() if k in params}
+
+    def prepare(self, panel_kwargs: dict = None) -> None:
+        """Prepares the data of all the panels in parallel, drawing stays on the main thread,
+        panel_kwargs maps the panel names to the arguments their plot will be called with
+        so the panels are prepared with the same arguments they are plotted with"""
+        panel_kwargs = {} if panel_kwargs is None else panel_kwargs
+        # arguments are picked on the main thread, workers only fill their own plotter's _prepped
+        jobs = [
+            (p.prepare, self._prepare_args(p, panel_kwargs.get(name, {})))
+            for name, p in self.plotters.items()
+        ]
+        with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+            list(ex.map(lambda job: job[0](**job[1]), jobs))
+
+    def plot(self, out_path: str = None, panel_kwargs: dict = None, **kwargs):
+        """Plots the summary figure, if out_path is given saves it there and closes the figure,
+        panel_kwargs maps the panel names(e.g. "resphist") to extra arguments of their plot
+        """
+        panel_kwargs = {
+            "performance": {"seperate_by": "contrast"},
+            **({} if panel_kwargs is None else panel_kwargs),
+        }
+        panel_kwargs = {name: panel_kwargs.get(name, {}) for name in self.plotters}
+        self.prepare(panel_kwargs)
         self.fig = plt.figure(figsize=kwargs.get("figsize", (20, 10)))
         widths = [2, 2, 1]
         heights = [1, 1]
@@ -754,30 +914,42 @@ class DetectionSummaryPlotter:
         gs_in1 = gs[:, 0].subgridspec(nrows=2, ncols=1, hspace=0.3)
 
         ax_perf = self.fig.add_subplot(gs_in1[1, 0])
-        ax_perf = self.plotters["performance"].plot(ax=ax_perf, seperate_by="contrast")
+        ax_perf = self.plotters["performance"].plot(
+            ax=ax_perf, **panel_kwargs["performance"]
+        )
 
         ax_lick = ax_perf.twinx()
-        ax_lick = self.plotters["licktotal"].plot(ax=ax_lick)
+        ax_lick = self.plotters["licktotal"].plot(ax=ax_lick, **panel_kwargs["licktotal"])
         ax_lick.grid(False)
 
         ax_resp = self.fig.add_subplot(gs_in1[0, 0])
-        ax_resp = self.plotters["resphist"].plot(ax=ax_resp)
+        ax_resp = self.plotters["resphist"].plot(ax=ax_resp, **panel_kwargs["resphist"])
 
         ax_resp2 = self.fig.add_subplot(gs[0, 1])
-        ax_resp2 = self.plotters["responsepertype"].plot(ax=ax_resp2)
+        ax_resp2 = self.plotters["responsepertype"].plot(
+            ax=ax_resp2, **panel_kwargs["responsepertype"]
+        )
 
         ax_type = self.fig.add_subplot(gs[0, 2])
-        ax_type = self.plotters["resptype"].plot(ax=ax_type)
+        ax_type = self.plotters["resptype"].plot(ax=ax_type, **panel_kwargs["resptype"])
 
         ax_scatter = self.fig.add_subplot(gs[1, 1])
-        ax_scatter = self.plotters["respscatter"].plot(ax=ax_scatter)
+        ax_scatter = self.plotters["respscatter"].plot(
+            ax=ax_scatter, **panel_kwargs["respscatter"]
+        )
 
         ax_ldist = self.fig.add_subplot(gs[1, 2])
-        ax_ldist = self.plotters["lickdist"].plot(ax=ax_ldist)
+        ax_ldist = self.plotters["lickdist"].plot(ax=ax_ldist, **panel_kwargs["lickdist"])
 
         self.fig.tight_layout()
 
+        if out_path is not None:
+            self.fig.savefig(out_path, bbox_inches="tight")
+            display(f"Saved {os.path.basename(out_path)} plot")
+            self.close()
+
     def save(self, saveloc, date, animalid):
+        """Saves the summary figure and closes it, so batches only ever hold one figure"""
         if self.fig is not None:
             saveloc = pjoin(saveloc, "figures")
             if not os.path.exists(saveloc):
@@ -786,3 +958,10 @@ class DetectionSummaryPlotter:
             saveloc = pjoin(saveloc, savename)
             self.fig.savefig(saveloc, bbox_inches="tight")
             display(f"Saved {savename} plot")
+            self.close()
+
+    def close(self) -> None:
+        """Closes the summary figure to free its artists"""
+        if self.fig is not None:
+            plt.close(self.fig)
+            self.fig = None
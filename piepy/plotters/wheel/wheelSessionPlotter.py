@@ -303,7 +303,7 @@ class WheelLickScatterPlotter(LickScatterPlotter):
 
 
 class WheelWheelTrajectoryPlotter(WheelTrajectoryPlotter):
-    __slots__ = []
+    __slots__ = ["side_sep_dict"]
 
     def __init__(
         self, data: dict, stimkey: str = None, seperate_by: str = "contrast", **kwargs
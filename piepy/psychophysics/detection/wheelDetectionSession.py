@@ -19,8 +19,9 @@ class WheelDetectionRunMeta(RunMeta):
     def __init__(self, prot_file: str) -> None:
         super().__init__(prot_file)
 
-        self.sf_values = nonan_unique(self.params["sf"].to_numpy()).tolist()
-        self.tf_values = nonan_unique(self.params["tf"].to_numpy()).tolist()
+        # unique values in order of appearance, straight from pandas without a numpy nan mask
+        self.sf_values = self.params["sf"].dropna().unique().tolist()
+        self.tf_values = self.params["tf"].dropna().unique().tolist()
 
 
 class WheelDetectionRunData(RunData):
@@ -431,7 +432,10 @@ class WheelDetectionSession(Session):
         super().__init__(sessiondir, load_flag, save_mat)
 
         # sets session meta
-        self.set_session_meta(skip_google=kwargs.get("skip_google", False))
+        self.set_session_meta(
+            skip_google=kwargs.get("skip_google", False),
+            gsheet_df=kwargs.get("gsheet_df", None),
+        )
 
         # initialize runs : read and parse or load the data
         self.init_session_runs()
@@ -478,6 +482,14 @@ class WheelDetectionSession(Session):
 
             self.runs.append(run)
 
+    @staticmethod
+    def load_run_data(data_path: str) -> pl.DataFrame:
+        """Loads the saved data of a run the same way init_session_runs does"""
+        run_data = WheelDetectionRunData()
+        run_data.load_data(data_path)
+        run_data.set_outcome("state")
+        return run_data.data
+
 
 @timeit("Getting rolling averages...")
 def get_running_stats(data_in: pd.DataFrame, window_size: int = 20) -> pd.DataFrame:
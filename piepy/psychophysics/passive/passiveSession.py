@@ -97,19 +97,12 @@ class PassiveRun(Run):
             "Trial increment faulty, extracting from state changes...", color="yellow"
         )
 
-        trialends = self.rawdata["statemachine"].with_columns(
-            pl.when(pl.col("transition").str.contains("trialend"))
-            .then(1)
-            .otherwise(0)
-            .alias("end_flag")
+        end_flag = (
+            self.rawdata["statemachine"]["transition"].str.contains("trialend").to_numpy()
         )
-
-        trial_no = []
-        t_cntr = 1
-        for i in trialends["end_flag"].to_list():
-            trial_no.append(t_cntr)
-            if i:
-                t_cntr += 1
+        # a state change belongs to the trial after the number of trialends before it
+        ends = np.flatnonzero(end_flag)
+        trial_no = np.searchsorted(ends, np.arange(len(end_flag)), side="left") + 1
 
         new_trial_no = pl.Series("trialNo", trial_no)
         self.rawdata["statemachine"] = self.rawdata["statemachine"].with_columns(
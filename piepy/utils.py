@@ -3,9 +3,11 @@ from scipy.interpolate import interp1d
 import pandas as pd
 import polars as pl
 import os
+import copy
 import json
 import sys
 import time
+import functools
 from ast import literal_eval
 from colorama import Fore, Style
 from tqdm import tqdm
@@ -143,6 +145,32 @@ def load_json_dict(path: str) -> dict:
         return json.load(f_in)
 
 
+def cache_by_stat(maxsize: int = 128):
+    """Caches the parsed result of a log file, keyed on its path, modification time and size
+    so any change to the file invalidates the cached result.
+    Callers get shallow copies of the returned containers so they can't modify the cache
+    """
+
+    def decorator(func):
+        @functools.lru_cache(maxsize=maxsize)
+        def _cached(fname, mtime_ns, size):
+            return func(fname)
+
+        @functools.wraps(func)
+        def wrapper(fname):
+            f_stat = os.stat(fname)
+            result = _cached(fname, f_stat.st_mtime_ns, f_stat.st_size)
+            if isinstance(result, tuple):
+                return tuple(copy.copy(r) for r in result)
+            return copy.copy(result)
+
+        wrapper.cache_clear = _cached.cache_clear
+        return wrapper
+
+    return decorator
+
+
+@cache_by_stat()
 def parsePref(preffile):
     with open(preffile, "r") as infile:
         pref = json.load(infile)
@@ -646,6 +674,7 @@ def remove_brackets(x, convert_flag=True):
         return x
 
 
+@cache_by_stat()
 def parseProtocolFile(protfile):
     options = {}
     comments = []
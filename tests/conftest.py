@@ -0,0 +1,41 @@
+import os
+import json
+import atexit
+import tempfile
+
+# piepy reads config.json from the repo root on import, write a throwaway one for the tests
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CONFIG_PATH = os.path.join(_REPO_ROOT, "config.json")
+
+if not os.path.exists(_CONFIG_PATH):
+    _tmp_dir = tempfile.mkdtemp(prefix="piepy_test_")
+    _colors_path = os.path.join(_tmp_dir, "colors.json")
+    with open(_colors_path, "w") as f:
+        json.dump(
+            {
+                "spatiotemporal": {},
+                "contrast": {},
+                "outcome": {
+                    "-1": {"color": "r"},
+                    "0": {"color": "k"},
+                    "1": {"color": "g"},
+                },
+            },
+            f,
+        )
+
+    with open(_CONFIG_PATH, "w") as f:
+        json.dump(
+            {
+                "paths": {
+                    "gsheet": [os.path.join(_tmp_dir, "credentials.json")],
+                    "colors": [_colors_path],
+                    "analysis": [os.path.join(_tmp_dir, "analysis")],
+                    "presentation": [os.path.join(_tmp_dir, "presentation")],
+                    "training": [os.path.join(_tmp_dir, "training")],
+                },
+                "multiprocess": {"enable": False, "cores": 1},
+            },
+            f,
+        )
+    atexit.register(os.remove, _CONFIG_PATH)
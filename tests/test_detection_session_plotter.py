@@ -0,0 +1,82 @@
+import numpy as np
+import polars as pl
+import matplotlib
+
+matplotlib.use("Agg")
+
+from piepy.plotters.detection.wheelDetectionSessionPlotter import (
+    DetectionResponseHistogramPlotter,
+    DetectionResponseTypeBarPlotter,
+    DetectionSummaryPlotter,
+)
+
+
+def make_session_data(n_hits: int = 200, n_early: int = 50) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    n = n_hits + n_early
+    blank_dur = rng.uniform(1000, 1100, n)
+    resp_lat = np.concatenate(
+        [rng.uniform(200, 800, n_hits), rng.uniform(100, 900, n_early)]
+    )
+    return pl.DataFrame(
+        {
+            "outcome": [1] * n_hits + [-1] * n_early,
+            "response_latency": resp_lat,
+            "t_blank_dur": blank_dur,
+            "stim_type": ["0.04cpd_8Hz"] * n,
+            "stimkey": ["0.04cpd_8Hz_-1"] * n,
+            "stim_label": ["0.04cpd_8Hz"] * n,
+            "opto": [0] * n,
+            "contrast": [100.0] * n,
+        }
+    )
+
+
+def test_shuffle_band_counts_all_hits():
+    n_hits = 200
+    plotter = DetectionResponseHistogramPlotter(make_session_data(n_hits))
+    plotter.prepare(shuffle=True, n_shuffle=200)
+
+    band_mean, band_std = plotter._prepped["hits"][0]["band"]
+    assert band_mean.shape == band_std.shape
+    # the shuffled blanks are close to the real ones, so nearly every hit stays in the bins
+    assert 0.8 * n_hits <= band_mean.sum() <= n_hits
+    assert np.all(band_std >= 0)
+
+
+def make_summary_data(n_hits: int = 40, n_early: int = 10) -> pl.DataFrame:
+    data = make_session_data(n_hits, n_early)
+    n = len(data)
+    return data.with_columns(
+        [
+            pl.col("t_blank_dur").alias("blank_time"),
+            pl.Series("open_start_absolute", np.arange(n) * 5000.0),
+            pl.Series("opto_pattern", [-1] * n),
+            pl.Series("reward", [[2000.0]] * n_hits + [None] * n_early),
+            pl.Series("lick", [[1900.0, 2100.0]] * n),
+        ]
+    )
+
+
+def test_response_type_bar_plot_keeps_plot_data():
+    data = make_summary_data()
+    plotter = DetectionResponseTypeBarPlotter(data, stimkey="all")
+    plotter.plot()
+    assert plotter.plot_data.equals(data)
+    # the data can still be aggregated after plotting
+    plotter.prepare()
+    assert plotter._prepped["count"].sum() == len(data)
+
+
+def test_summary_prepares_panels_with_their_plot_args():
+    data = make_summary_data()
+    # only the panels that can be built from this frame
+    plotter = DetectionSummaryPlotter.__new__(DetectionSummaryPlotter)
+    plotter.plotters = {
+        "resphist": DetectionResponseHistogramPlotter(data, stimkey="all"),
+        "resptype": DetectionResponseTypeBarPlotter(data, stimkey="all"),
+    }
+    # plot only arguments like color are not passed to prepare
+    plotter.prepare({"resphist": {"bin_width": 20, "color": "k"}})
+    assert plotter.plotters["resphist"]._prepped["params"] == (20, False, False, 1000)
+    assert plotter.plotters["resptype"]._prepped is not None
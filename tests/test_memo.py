@@ -0,0 +1,77 @@
+import os
+import types
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from piepy.core._memo import SessionMemo
+from piepy.psychophysics.detection.wheelDetectionSession import (
+    WheelDetectionRun,
+    WheelDetectionRunData,
+    WheelDetectionSession,
+)
+
+
+def make_saved_run(save_dir) -> str:
+    """Saves a small run the way an analyzed run is saved and returns the data path"""
+    rng = np.random.default_rng(0)
+    n = 20
+    raw = pl.DataFrame(
+        {
+            "trial_no": np.arange(1, n + 1),
+            "stim_pos": rng.choice([-1, 0, 1], n),
+            "spatial_freq": [0.04] * n,
+            "temporal_freq": [8.0] * n,
+            "contrast": rng.choice([0.0, 12.5, 50.0, 100.0], n),
+            "opto": [0] * n,
+            "state_outcome": rng.choice([-1, 0, 1], n),
+        }
+    )
+    run_data = WheelDetectionRunData(raw)
+    run_data.add_pattern_related_columns()
+    run_data.set_outcome("state")
+    run_data.save_data(str(save_dir))
+    return os.path.join(str(save_dir), "runData.parquet")
+
+
+def test_memo_hit_matches_fresh_load(tmp_path):
+    session_dir = tmp_path / "presentation" / "240101_KC000_detect_KC"
+    session_dir.mkdir(parents=True)
+    (session_dir / "run.prot").write_text("")
+    (session_dir / "run.stimlog").write_text("")
+    save_dir = tmp_path / "analysis"
+    save_dir.mkdir()
+    data_path = make_saved_run(save_dir)
+
+    memo = SessionMemo(str(tmp_path / "memo.json"))
+    memo.set("240101_KC000_detect_KC", str(session_dir), {"date": "240101"}, data_path)
+    memo.save()
+
+    # fresh load, as the loading branch of WheelDetectionSession.init_session_runs does
+    run = WheelDetectionRun.__new__(WheelDetectionRun)
+    run.data = WheelDetectionRunData()
+    run.paths = types.SimpleNamespace(data=[data_path], save=[str(save_dir)])
+    run.load_run()
+    run.data.set_outcome("state")
+
+    entry = SessionMemo(str(tmp_path / "memo.json")).get(
+        "240101_KC000_detect_KC", str(session_dir)
+    )
+    assert entry is not None
+    summary, memo_data_path = entry
+    assert summary == {"date": "240101"}
+    assert_frame_equal(WheelDetectionSession.load_run_data(memo_data_path), run.data.data)
+
+
+def test_memo_is_stale_after_the_run_data_changes(tmp_path):
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+    (session_dir / "run.prot").write_text("")
+    data_path = make_saved_run(tmp_path)
+
+    memo = SessionMemo(str(tmp_path / "memo.json"))
+    memo.set("session", str(session_dir), {}, data_path)
+    mtime = os.path.getmtime(data_path)
+    os.utime(data_path, (mtime + 10, mtime + 10))
+    assert memo.get("session", str(session_dir)) is None
@@ -0,0 +1,30 @@
+import numpy as np
+import polars as pl
+import scipy.io as sio
+
+from piepy.core.run import RunData
+
+
+def test_save_as_mat_with_nulls(tmp_path):
+    data = pl.DataFrame(
+        {
+            "trial_no": [1, 2, 3],
+            "response_latency": [250.0, None, 410.0],
+            "reward": [1, None, 0],
+            "stim_side": ["contra", None, "ipsi"],
+            "lick": [[10.0, 20.0], None, [30.0]],
+        }
+    ).with_columns(pl.lit(None).alias("opto_region"))
+
+    RunData(data).save_as_mat(str(tmp_path))
+    mat = sio.loadmat(str(tmp_path / "sessionData.mat"))
+
+    # all null columns have nothing to save
+    assert "opto_region" not in mat
+    np.testing.assert_array_equal(mat["trial_no"].ravel(), [1, 2, 3])
+    np.testing.assert_array_equal(mat["response_latency"].ravel(), [250.0, np.nan, 410.0])
+    np.testing.assert_array_equal(mat["reward"].ravel(), [1.0, np.nan, 0.0])
+    # strings come back as a cell array, empty strings as empty cells
+    assert ["".join(s) for s in mat["stim_side"].ravel()] == ["contra", "", "ipsi"]
+    np.testing.assert_array_equal(mat["lick"].ravel()[0].ravel(), [10.0, 20.0])
+    assert mat["lick"].ravel()[1].size == 0